@@ -1,19 +1,37 @@
+import os
+# Stream-ordered CUDA allocator, opt-in since it rules out the CUDA Graphs of
+# torch.compile's "reduce-overhead" mode; must be set before torch is imported
+if os.environ.get("SHEEP_CUDA_MALLOC_ASYNC", "0") == "1":
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "backend:cudaMallocAsync")
+
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 import uvicorn
+import asyncio
 import io
+import queue
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
+from torchvision import models
+from torchvision.io import decode_jpeg, ImageReadMode
+from torchvision.transforms import v2
 from PIL import Image
 import numpy as np
-import random
-import os
+import itertools
+import copy
 import logging
 import sklearn.preprocessing
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
 
 # --- LOGGING SETUP ---
 logging.basicConfig(
@@ -25,27 +43,355 @@ logger = logging.getLogger(__name__)
 # --- CONFIGURATION ---
 MODEL_PATH = "sheep_resnet18_finetuned (2).pth"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# Tensor cores run ResNet convs at 2x throughput in half precision
+INFER_DTYPE = torch.float16 if DEVICE == "cuda" else torch.float32
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+IMAGE_SIZE = (224, 224)
+# conv1's zero padding, applied during preprocessing instead (see fold_input_normalization)
+INPUT_PAD = 3
+INPUT_SHAPE = (1, 3, IMAGE_SIZE[0] + 2 * INPUT_PAD, IMAGE_SIZE[1] + 2 * INPUT_PAD)
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+WARMUP_ITERS = 3
+MAX_BATCH = 16
+# Micro-batches are padded up to one of these sizes, all warmed up at startup
+BATCH_BUCKETS = (1, 2, 4, 8, MAX_BATCH)
+MAX_WAIT_MS = 5
+JPEG_MAGIC = b"\xff\xd8"
+# Reduced-scale JPEG decoding: faster, but its DCT downscale is not the
+# resize the model was trained with, so it is opt-in
+USE_JPEG_DRAFT = os.environ.get("SHEEP_JPEG_DRAFT", "0") == "1"
+# Cores this process may run on: the affinity mask reflects taskset/cpuset
+# limits, os.cpu_count() always reports the whole host
+if hasattr(os, "sched_getaffinity"):
+    CPU_COUNT = len(os.sched_getaffinity(0)) or 1
+else:
+    CPU_COUNT = os.cpu_count() or 1
+USE_ONNX = os.environ.get("SHEEP_ONNX", "0") == "1"
+# Post-training int8 quantization (CPU only), calibrated on real sheep images
+USE_INT8 = os.environ.get("SHEEP_INT8", "0") == "1" and DEVICE == "cpu"
+CALIB_DIR = os.environ.get("SHEEP_CALIB_DIR")
+CALIB_MAX_IMAGES = 100
+# Checkpoint keys: "cnn.*" is the ResNet backbone, the tabular/head layers are unused
+CNN_PREFIX = "cnn."
+CNN_PREFIX_LEN = len(CNN_PREFIX)
+DROPPED_PREFIXES = ("tab_mlp", "final_head")
+# Intra-op threads per process: for batch-sized ResNet18 more threads cost more
+# in fork/join than they save, and cgroup-limited pods oversubscribe otherwise
+REQUESTED_TORCH_THREADS = max(1, int(os.environ.get("TORCH_THREADS", "4")))
+# uvicorn worker processes. On CPU the cores are partitioned between workers
+# (requests in parallel) and torch threads (parallelism within a request);
+# GPU deploys are capped so workers don't oversubscribe the single device
+if DEVICE == "cuda":
+    DEFAULT_WORKERS = min(max(2, CPU_COUNT // 2), 4)
+else:
+    DEFAULT_WORKERS = max(1, CPU_COUNT // REQUESTED_TORCH_THREADS)
+WORKERS = max(1, int(os.environ.get("SHEEP_WORKERS", DEFAULT_WORKERS)))
+# Every worker process sizes its own thread pools, so each only gets its
+# share of the cores whatever SHEEP_WORKERS / TORCH_THREADS ask for
+CORES_PER_WORKER = max(1, CPU_COUNT // WORKERS)
+TORCH_THREADS = min(REQUESTED_TORCH_THREADS, CORES_PER_WORKER)
+PREPROC_WORKERS = CORES_PER_WORKER
+
+# --- RUNTIME TUNING ---
+# Input shapes only vary with the micro-batch size, so let cuDNN autotune each
+# conv once (warmup pays for it) and allow TF32 on Ampere+ for fp32 ops
+torch.backends.cudnn.benchmark = True
+torch.backends.cudnn.allow_tf32 = True
+torch.backends.cuda.matmul.allow_tf32 = True
+# Set at import, before any parallel work: interop threads can only be set once,
+# and torch raises if this module is imported a second time in one process
+torch.set_num_threads(TORCH_THREADS)
+if torch.get_num_interop_threads() != 1:
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError as e:
+        logger.warning(f"⚠️ Could not limit interop threads: {e}")
 
 # --- GLOBAL VARIABLES ---
 model = None
 model_loaded = False
+ort_session = None
 output_scaler = None 
+# output_scaler.inverse_transform as a plain affine map (None if unsupported)
+output_scale = None
+output_offset = None
 target_names = ["weight", "lean", "fat", "bone"]
+# results key for each model output (None = unused), see build_target_keys
+target_keys = []
+batch_queue = None
+batch_task = None
+INFER_STREAM = None
+# Pinned host buffers for async H2D copies (one per preprocessing worker),
+# each paired with a CUDA event marking the end of its last copy
+PINNED_POOL = queue.Queue()
+# Single inference thread: forwards stay serialized on one device stream
+INFER_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="infer")
+# Decode/resize/normalize run here so they never block the event loop
+PREPROC_POOL = ThreadPoolExecutor(max_workers=PREPROC_WORKERS, thread_name_prefix="preproc")
+
+# --- SIMULATED VALUES ---
+# Pre-drawn pools indexed by a shared counter, so requests don't go through
+# the locked Mersenne Twister in `random` each time
+RNG_POOL_SIZE = 16384  # power of two, indexed with a mask
+RNG_POOL_MASK = RNG_POOL_SIZE - 1
+_rng = np.random.default_rng()
+CONFIDENCE_POOL = _rng.uniform(88.0, 99.0, RNG_POOL_SIZE).round(1).tolist()
+SIM_CONFIDENCE_POOL = _rng.uniform(85.0, 98.0, RNG_POOL_SIZE).round(1).tolist()
+SIM_WEIGHT_POOL = _rng.uniform(40.0, 70.0, RNG_POOL_SIZE).round(2).tolist()
+rng_counter = itertools.count()
+
+def draw(pool):
+    return pool[next(rng_counter) & RNG_POOL_MASK]
 
 # --- IMAGE TRANSFORMS ---
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225]
-    )
+# Only ToTensor's x / 255 happens here: the ImageNet mean/std normalization
+# is folded into conv1 at load time (see fold_input_normalization)
+PIXEL_SCALE = np.float32(1.0 / 255.0)
+MEAN_PIXEL = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+
+def pad_input(x: torch.Tensor) -> torch.Tensor:
+    # Border of mean-colored pixels, which normalize to exactly 0: the folded
+    # conv1 then sees what the original saw through its zero padding
+    mean = MEAN_PIXEL.to(x)
+    return torch.nn.functional.pad(x - mean, (INPUT_PAD,) * 4) + mean
+
+# Same pipeline for JPEGs decoded straight onto the GPU (uint8 CHW tensors)
+gpu_transform = v2.Compose([
+    v2.Resize(IMAGE_SIZE, antialias=True),
+    v2.ToDtype(torch.float32, scale=True)
 ])
 
+# --- MODEL OPTIMIZATION ---
+def autocast_context():
+    # No-op on CPU; warmup and serving must share it so compiled guards match
+    return torch.autocast(device_type="cuda", dtype=INFER_DTYPE, enabled=DEVICE == "cuda")
+
+def warmup_model(m):
+    # Run a few dummy forwards so compilation / autotuning happens at startup
+    # instead of on the first real request. Every batch bucket is hit, and
+    # run_batch only ever feeds bucket sizes, so serving never recompiles.
+    # Runs on the inference thread and stream, where run_batch will call the
+    # model: Inductor keeps its CUDA graph trees in thread-local state, so
+    # graphs recorded on any other thread would not be reused.
+    INFER_POOL.submit(_warmup_forwards, m).result()
+
+def _warmup_forwards(m):
+    stream = torch.cuda.stream(INFER_STREAM) if INFER_STREAM is not None else nullcontext()
+    with stream, torch.inference_mode(), autocast_context():
+        for batch_size in BATCH_BUCKETS:
+            dummy = torch.zeros(batch_size, *INPUT_SHAPE[1:], device=DEVICE, dtype=INFER_DTYPE)
+            for _ in range(WARMUP_ITERS):
+                m(dummy)
+    if DEVICE == "cuda":
+        torch.cuda.synchronize()
+
+def compile_model(m):
+    # Inductor fuses conv+bn+relu and "reduce-overhead" replays the forward as
+    # a CUDA Graph. Image size is fixed by preprocessing and batch size is one
+    # of BATCH_BUCKETS, so a static graph per bucket is compiled during warmup.
+    if not hasattr(torch, "compile"):
+        logger.warning("⚠️ torch.compile not available")
+        return None
+
+    # CUDA Graphs only work with the native caching allocator; under
+    # cudaMallocAsync keep the Inductor kernels without graph replay
+    mode = "reduce-overhead"
+    if DEVICE == "cuda" and torch.cuda.get_allocator_backend() != "native":
+        mode = "default"
+
+    try:
+        compiled = torch.compile(m, mode=mode, fullgraph=True, dynamic=False)
+        warmup_model(compiled)
+        logger.info(f"✅ Model compiled with torch.compile ({mode})")
+        return compiled
+    except Exception as e:
+        logger.warning(f"⚠️ torch.compile failed: {e}")
+        return None
+
+def script_model(m):
+    # Ahead-of-time fallback: freezing inlines the weights as constants and
+    # optimize_for_inference folds BN into conv and drops training branches.
+    try:
+        scripted = torch.jit.script(m)
+        scripted = torch.jit.freeze(scripted)
+        scripted = torch.jit.optimize_for_inference(scripted)
+        # The profiling executor specializes on the first calls, pay that now
+        warmup_model(scripted)
+        logger.info("✅ Model frozen with TorchScript")
+        return scripted
+    except Exception as e:
+        logger.warning(f"⚠️ TorchScript freeze failed: {e}")
+        return None
+
+def load_checkpoint():
+    # mmap=True maps the file instead of reading it into memory up front, and
+    # the mapped pages are dropped once the state dict is released. Each
+    # worker still ends up with its own copy of the parameters: loading,
+    # folding and fusion all write new tensors
+    try:
+        return torch.load(MODEL_PATH, map_location=DEVICE, weights_only=False, mmap=True)
+    except (TypeError, RuntimeError) as e:
+        # Older torch or a legacy (non-zip) checkpoint
+        logger.warning(f"⚠️ mmap load unavailable, reading checkpoint: {e}")
+        return torch.load(MODEL_PATH, map_location=DEVICE, weights_only=False)
+
+def build_target_keys(names):
+    # Resolve the target-name matching once at load time instead of doing
+    # the substring checks on every request
+    keys = []
+    for name in names:
+        name_clean = name.lower()
+        if 'weight_kg' in name_clean:
+            keys.append('live_weight')
+        elif 'lean_kg' in name_clean:
+            keys.append('lean_mass')
+        elif 'fat_kg' in name_clean:
+            keys.append('fat_mass')
+        elif 'carcass' in name_clean:
+            keys.append('carcass_weight')
+        else:
+            keys.append(None)
+    return keys
+
+def scaler_affine(scaler):
+    # Inverse transform of the usual sklearn scalers is x * scale + offset;
+    # applying it directly skips sklearn's per-call validation and copies
+    if isinstance(scaler, sklearn.preprocessing.StandardScaler):
+        n = scaler.n_features_in_
+        scale = scaler.scale_ if scaler.with_std else np.ones(n)
+        offset = scaler.mean_ if scaler.with_mean else np.zeros(n)
+    elif isinstance(scaler, sklearn.preprocessing.MinMaxScaler):
+        scale = 1.0 / scaler.scale_
+        offset = -scaler.min_ / scaler.scale_
+    else:
+        return None, None
+    return scale.astype(np.float32), offset.astype(np.float32)
+
+def fold_input_normalization(m):
+    # conv1((x - mean) / std) == conv1'(x) with w' = w / std and
+    # b' = b - sum(w * mean / std), so preprocessing can skip Normalize.
+    # That only holds where conv1 reads real pixels: its zero padding would
+    # stand for -mean / std after folding, which skews every border output.
+    # conv1 is therefore left unpadded and pad_input pre-pads the image with
+    # the mean color instead, which keeps the fold exact.
+    conv = m.conv1
+    mean = MEAN_PIXEL.to(conv.weight)
+    std = torch.tensor(IMAGENET_STD).to(conv.weight).view(1, 3, 1, 1)
+    with torch.no_grad():
+        shift = (conv.weight * (mean / std)).sum(dim=(1, 2, 3))
+        bias = conv.bias if conv.bias is not None else torch.zeros_like(shift)
+        conv.weight.div_(std)
+        conv.bias = nn.Parameter(bias - shift)
+    conv.padding = (0, 0)
+    return m
+
+def fuse_conv_bn(m):
+    # Fold every BatchNorm2d into the Conv2d right before it (eval mode only),
+    # removing 20 kernels and a full activation read/write from each forward
+    modules = list(m.named_modules())
+    pairs = [
+        [name, next_name]
+        for (name, module), (next_name, next_module) in zip(modules, modules[1:])
+        if isinstance(module, nn.Conv2d) and isinstance(next_module, nn.BatchNorm2d)
+    ]
+    torch.ao.quantization.fuse_modules(m, pairs, inplace=True)
+    logger.info(f"✅ Fused {len(pairs)} Conv+BN pairs")
+    return m
+
+def calibration_images():
+    if not CALIB_DIR or not os.path.isdir(CALIB_DIR):
+        return []
+    paths = sorted(
+        os.path.join(CALIB_DIR, name) for name in os.listdir(CALIB_DIR)
+        if os.path.splitext(name)[1].lower() in ALLOWED_EXTENSIONS
+    )
+    return paths[:CALIB_MAX_IMAGES]
+
+def quantize_int8(m):
+    # Static quantization: convs and fc run as int8 kernels (VNNI on x86).
+    # Activation ranges have to be observed on representative inputs, so
+    # without calibration images the fp32 model is kept.
+    images = calibration_images()
+    if not images:
+        logger.warning("⚠️ SHEEP_INT8 set but no images in SHEEP_CALIB_DIR, serving fp32 model")
+        return m
+
+    try:
+        # Work on a copy so a failure halfway leaves the fp32 model intact
+        quantized = copy.deepcopy(m)
+        engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+        torch.backends.quantized.engine = engine
+        quantized.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+        torch.ao.quantization.prepare(quantized, inplace=True)
+        with torch.no_grad():
+            for path in images:
+                with open(path, "rb") as f:
+                    quantized(decode_and_transform(f))
+        torch.ao.quantization.convert(quantized, inplace=True)
+        logger.info(f"✅ Model quantized to int8 ({engine}, {len(images)} calibration images)")
+        return quantized
+    except Exception as e:
+        logger.warning(f"⚠️ int8 quantization failed, serving fp32 model: {e}")
+        return m
+
+def init_cuda_resources():
+    global INFER_STREAM
+    # A non-default stream lets the next request's H2D copy overlap the
+    # current forward
+    INFER_STREAM = torch.cuda.Stream()
+    while PINNED_POOL.qsize() < PREPROC_WORKERS:
+        buffer = torch.empty(*INPUT_SHAPE, dtype=INFER_DTYPE, pin_memory=True)
+        PINNED_POOL.put((buffer, torch.cuda.Event()))
+
+def export_onnx(m):
+    # ONNX Runtime drops the Python dispatch overhead entirely, which is
+    # where most of the time goes for ResNet18 on CPU
+    if ort is None:
+        logger.warning("⚠️ onnxruntime not installed, ignoring SHEEP_ONNX")
+        return None
+
+    try:
+        dummy = torch.zeros(*INPUT_SHAPE, device=DEVICE, dtype=INFER_DTYPE)
+        # Exported in memory: every uvicorn worker runs this at startup, and a
+        # shared file on disk would be written by several of them at once
+        onnx_model = io.BytesIO()
+        # dynamo=False: newer torch defaults to the dynamo exporter, which
+        # needs onnxscript and handles dynamic_axes / file objects differently
+        torch.onnx.export(
+            m, dummy, onnx_model,
+            dynamo=False,
+            opset_version=17,
+            input_names=["input"],
+            output_names=["output"],
+            dynamic_axes={"input": {0: "B"}, "output": {0: "B"}}
+        )
+
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        available = ort.get_available_providers()
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+        session = ort.InferenceSession(onnx_model.getvalue(), sess_options=so, providers=providers)
+        session.run(None, {"input": dummy.cpu().numpy()})
+        logger.info(f"✅ Model exported to ONNX, serving with {session.get_providers()[0]}")
+        return session
+    except Exception as e:
+        logger.warning(f"⚠️ ONNX export failed, serving PyTorch model: {e}")
+        return None
+
+def optimize_model(m):
+    optimized = compile_model(m)
+    if optimized is None:
+        optimized = script_model(m)
+    if optimized is None:
+        logger.warning("⚠️ Serving eager model")
+        return m
+    return optimized
+
 # --- MODEL LOADING LOGIC ---
 def load_model():
-    global model, model_loaded, output_scaler, target_names
+    global model, model_loaded, output_scaler, target_names, ort_session
+    global output_scale, output_offset, target_keys
     
     if not os.path.exists(MODEL_PATH):
         logger.warning(f"⚠️ Model file not found: {MODEL_PATH}")
@@ -53,10 +399,14 @@ def load_model():
     
     try:
         logger.info(f"🔄 Loading Model from {MODEL_PATH}...")
-        checkpoint = torch.load(MODEL_PATH, map_location=DEVICE, weights_only=False)
+        checkpoint = load_checkpoint()
         
-        # 1. Initialize Standard ResNet18
-        model = models.resnet18(weights=None)
+        # 1. Initialize Standard ResNet18 (the quantizable variant has the
+        #    same parameter names, plus quant stubs and a quantized skip-add)
+        if USE_INT8:
+            model = models.quantization.resnet18(weights=None, quantize=False)
+        else:
+            model = models.resnet18(weights=None)
         
         # 2. Extract Metadata (Scaler & Target Names)
         if isinstance(checkpoint, dict):
@@ -73,18 +423,27 @@ def load_model():
         else:
             state_dict = checkpoint.state_dict()
 
+        output_scale, output_offset = scaler_affine(output_scaler)
+        target_keys = build_target_keys(target_names)
+
         # 4. FIX THE KEYS (The Magic Step)
         # Your saved model has keys like "cnn.layer1..." but ResNet expects "layer1..."
-        new_state_dict = {}
-        for key, value in state_dict.items():
-            # If the key starts with "cnn.", remove that prefix to make it match ResNet
-            if key.startswith("cnn."):
-                new_key = key.replace("cnn.", "")
-                new_state_dict[new_key] = value
-            # If the key is already standard ResNet (unlikely but possible)
-            elif not key.startswith("tab_mlp") and not key.startswith("final_head"):
-                new_state_dict[key] = value
-                
+        # Keys that are already standard ResNet (unlikely but possible) are kept as-is.
+        state_dict = {
+            (key[CNN_PREFIX_LEN:] if key.startswith(CNN_PREFIX) else key): value
+            for key, value in state_dict.items()
+            if not key.startswith(DROPPED_PREFIXES)
+        }
+        # Release the raw checkpoint so the dropped head tensors are freed now
+        del checkpoint
+
+        # The fc head has to come from the checkpoint. A freshly initialised
+        # one predicts noise, and a different noise in every worker process
+        if "fc.weight" not in state_dict:
+            logger.error("❌ Checkpoint has no trained fc head (fc.weight), not serving predictions")
+            model = None
+            return False
+
         # 5. Handle the Final Layer (fc)
         # Your custom model likely has a different head. We need to match the output size.
         num_outputs = len(target_names) if target_names else 4
@@ -94,13 +453,35 @@ def load_model():
         try:
             # We use strict=False because we might have dropped the 'final_head' 
             # layers from the saved file, which is fine.
-            model.load_state_dict(new_state_dict, strict=False)
+            model.load_state_dict(state_dict, strict=False)
             logger.info("✅ ResNet weights extracted and loaded successfully")
         except Exception as e:
             logger.error(f"⚠️ Weight loading error: {e}")
+        # Weights are copied into the model, the loaded tensors can go
+        del state_dict
 
-        model.to(DEVICE)
+        # 7. Fold input normalization and BatchNorm into the convs
+        #    (BN folding requires eval mode)
         model.eval()
+        fold_input_normalization(model)
+        if USE_INT8:
+            # Conv+BN+ReLU fusion, which int8 kernels need, then quantize
+            model.fuse_model()
+            model = quantize_int8(model)
+        else:
+            fuse_conv_bn(model)
+
+        if INFER_DTYPE == torch.float16:
+            model = model.half()
+        model.to(DEVICE)
+        if DEVICE == "cuda":
+            init_cuda_resources()
+
+        # 8. Serve through ONNX Runtime if enabled, otherwise compile the
+        #    forward pass (TorchScript, then eager, as fallbacks)
+        ort_session = export_onnx(model) if USE_ONNX else None
+        if ort_session is None:
+            model = optimize_model(model)
         model_loaded = True
         return True
         
@@ -115,12 +496,18 @@ async def lifespan(app: FastAPI):
     logger.info("=" * 60)
     logger.info("🚀 Starting Sheep Weight Prediction API")
     logger.info("=" * 60)
+    global batch_queue, batch_task
     load_model()
+    batch_queue = asyncio.Queue()
+    batch_task = asyncio.create_task(batch_worker())
     logger.info("=" * 60)
     logger.info("✅ Server ready to accept requests")
     logger.info("=" * 60)
     yield
     logger.info("🛑 Shutting down server...")
+    batch_task.cancel()
+    INFER_POOL.shutdown(wait=False)
+    PREPROC_POOL.shutdown(wait=False)
 
 # --- APP DEFINITION ---
 app = FastAPI(
@@ -132,49 +519,178 @@ app = FastAPI(
 
 
 
+# --- RESPONSE MODELS ---
+# With a declared response model FastAPI validates and encodes the response
+# in pydantic-core (Rust) instead of jsonable_encoder + json.dumps
+class CarcassBreakdown(BaseModel):
+    lean_percent: float
+    fat_percent: float
+    bone_percent: float
+
+class RawMetrics(BaseModel):
+    lean: float
+    fat: float
+    carcass_total: float
+
+class PredictionDetails(BaseModel):
+    carcass: CarcassBreakdown
+    raw_metrics_kg: RawMetrics
+
+class PredictionResponse(BaseModel):
+    success: bool
+    weight_kg: float
+    confidence: float
+    status: str
+    image_name: Optional[str] = None
+    # Only set on real predictions / in simulation mode respectively
+    details: Optional[PredictionDetails] = None
+    note: Optional[str] = None
+
+class StatusResponse(BaseModel):
+    message: str
+    status: str
+
+class HealthResponse(BaseModel):
+    status: str
+    model_loaded: bool
+
 # --- HELPER FUNCTIONS ---
 def preprocess_image(image: Image.Image) -> torch.Tensor:
     if image.mode != 'RGB':
         image = image.convert('RGB')
-    return transform(image).unsqueeze(0).to(DEVICE)
+    # Same bilinear (antialiased) resize transforms.Resize does on PIL images
+    image = image.resize(IMAGE_SIZE, Image.BILINEAR)
+    pixels = np.asarray(image, dtype=np.float32) * PIXEL_SCALE
+    tensor = pad_input(torch.from_numpy(pixels).permute(2, 0, 1).unsqueeze(0))
+    if DEVICE != "cuda":
+        return tensor
 
-def predict_metrics(input_tensor: torch.Tensor):
-    global output_scaler, target_names
-    
-    with torch.no_grad():
-        raw_output = model(input_tensor)
-        raw_numpy = raw_output.cpu().numpy()
+    staging, copied = PINNED_POOL.get()
+    try:
+        # The buffer's previous async copy has to land before it is
+        # overwritten; that wait is only paid when the buffer comes round again
+        copied.synchronize()
+        staging.copy_(tensor)
+        gpu_tensor = staging.to(DEVICE, non_blocking=True)
+        copied.record()
+    finally:
+        PINNED_POOL.put((staging, copied))
+    return gpu_tensor
+
+def decode_on_gpu(contents: bytes) -> torch.Tensor:
+    data = torch.frombuffer(bytearray(contents), dtype=torch.uint8)
+    image = decode_jpeg(data, mode=ImageReadMode.RGB, device=DEVICE)
+    return pad_input(gpu_transform(image).unsqueeze(0)).to(INFER_DTYPE)
 
-        if output_scaler:
+def decode_and_transform(fileobj) -> torch.Tensor:
+    # Runs inside PREPROC_POOL; PIL releases the GIL while decoding/resizing.
+    # fileobj is the upload's SpooledTemporaryFile, so PIL reads it
+    # incrementally instead of from a full in-memory copy.
+    if DEVICE == "cuda" and fileobj.read(2) == JPEG_MAGIC:
+        fileobj.seek(0)
+        try:
+            return decode_on_gpu(fileobj.read())
+        except Exception as e:
+            logger.warning(f"GPU decode failed, falling back to PIL: {e}")
+    fileobj.seek(0)
+    image = Image.open(fileobj)
+    if USE_JPEG_DRAFT:
+        # Decode JPEGs at a reduced DCT scale that still covers IMAGE_SIZE
+        image.draft("RGB", IMAGE_SIZE)
+    image.load()
+    return preprocess_image(image)
+
+def bucket_batch(tensors) -> torch.Tensor:
+    # Zero-pad up to the next warmed-up batch size: compiled graphs and
+    # cuDNN's autotuned kernels are per shape, so any other size would
+    # compile on the request path
+    n = len(tensors)
+    size = next(b for b in BATCH_BUCKETS if b >= n)
+    if size > n:
+        tensors = (*tensors, tensors[0].new_zeros(size - n, *tensors[0].shape[1:]))
+    return torch.cat(tensors, dim=0)
+
+def run_batch(tensors) -> np.ndarray:
+    if ort_session is not None:
+        batch = torch.cat(tensors, dim=0).cpu().numpy()
+        return ort_session.run(None, {"input": batch})[0].astype(np.float32)
+
+    n = len(tensors)
+    if INFER_STREAM is None:
+        with torch.inference_mode(), autocast_context():
+            raw_output = model(bucket_batch(tensors))[:n]
+        return raw_output.float().numpy()
+
+    # Inputs were produced on the default stream (GPU decode / H2D copy)
+    INFER_STREAM.wait_stream(torch.cuda.default_stream())
+    with torch.cuda.stream(INFER_STREAM), torch.inference_mode(), autocast_context():
+        for tensor in tensors:
+            tensor.record_stream(INFER_STREAM)
+        raw_output = model(bucket_batch(tensors))[:n]
+        # The sklearn scaler expects fp32/fp64
+        out_cpu = raw_output.float().to("cpu", non_blocking=True)
+    INFER_STREAM.synchronize()
+    return out_cpu.numpy()
+
+async def batch_worker():
+    # Collect up to MAX_BATCH pending requests (waiting at most MAX_WAIT_MS
+    # after the first one), run a single forward and scatter the rows back.
+    loop = asyncio.get_running_loop()
+    while True:
+        items = [await batch_queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while len(items) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
             try:
-                predictions = output_scaler.inverse_transform(raw_numpy)[0]
-            except Exception as e:
-                logger.error(f"Scaler failed: {e}")
-                predictions = raw_numpy[0]
-        else:
-            predictions = raw_numpy[0]
-        
-        logger.info(f"Raw Model Predictions: {predictions}")
+                items.append(await asyncio.wait_for(batch_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
 
-        results = {
-            'live_weight': 0.0, 'lean_mass': 0.0, 'fat_mass': 0.0, 'carcass_weight': 0.0
-        }
-        
-        for i, name in enumerate(target_names):
-            if i < len(predictions):
-                val = max(0.0, float(predictions[i])) 
-                name_clean = name.lower()
-                
-                if 'weight_kg' in name_clean:
-                    results['live_weight'] = val
-                elif 'lean_kg' in name_clean:
-                    results['lean_mass'] = val
-                elif 'fat_kg' in name_clean:
-                    results['fat_mass'] = val
-                elif 'carcass' in name_clean:
-                    results['carcass_weight'] = val
-
-        return results
+        tensors, futures = zip(*items)
+        try:
+            raw_batch = await loop.run_in_executor(INFER_POOL, run_batch, tensors)
+        except Exception as e:
+            logger.error(f"Batch inference failed: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        for future, row in zip(futures, raw_batch):
+            # Skip requests whose client went away while we were waiting
+            if not future.done():
+                future.set_result(row)
+
+async def infer(input_tensor: torch.Tensor) -> np.ndarray:
+    future = asyncio.get_running_loop().create_future()
+    await batch_queue.put((input_tensor, future))
+    return await future
+
+def predict_metrics(raw_row: np.ndarray):
+    if output_scale is not None:
+        predictions = raw_row * output_scale + output_offset
+    elif output_scaler:
+        try:
+            predictions = output_scaler.inverse_transform(raw_row.reshape(1, -1))[0]
+        except Exception as e:
+            logger.error(f"Scaler failed: {e}")
+            predictions = raw_row
+    else:
+        predictions = raw_row
+    
+    logger.info(f"Raw Model Predictions: {predictions}")
+
+    results = {
+        'live_weight': 0.0, 'lean_mass': 0.0, 'fat_mass': 0.0, 'carcass_weight': 0.0
+    }
+    
+    for key, value in zip(target_keys, predictions):
+        if key:
+            results[key] = max(0.0, float(value))
+
+    return results
 
 def determine_status(weight: float) -> str:
     if weight < 40: return "Underweight"
@@ -185,37 +701,36 @@ def determine_status(weight: float) -> str:
 
 # --- ROUTES ---
 
-@app.get("/")
+@app.get("/", response_model=StatusResponse)
 async def root():
     return {"message": "Sheep Weight API Running", "status": "online"}
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     return {"status": "healthy", "model_loaded": model_loaded}
 
-@app.post("/predict")
+@app.post("/predict", response_model=PredictionResponse, response_model_exclude_none=True)
 async def predict_weight_endpoint(file: UploadFile = File(...)):
     # 1. Fallback if model isn't loaded (e.g. for testing UI connection)
     if not model_loaded:
         # Simulate a random response for testing if no model file exists
         logger.warning("Model not loaded, simulating response for UI testing")
-        sim_weight = round(random.uniform(40.0, 70.0), 2)
+        sim_weight = draw(SIM_WEIGHT_POOL)
         return {
             "success": True,
             "weight_kg": sim_weight,
-            "confidence": round(random.uniform(85.0, 98.0), 1),
+            "confidence": draw(SIM_CONFIDENCE_POOL),
             "status": determine_status(sim_weight),
             "image_name": file.filename,
             "note": "SIMULATION MODE"
         }
 
-    contents = await file.read()
-    image = Image.open(io.BytesIO(contents))
-    
     try:
         # 2. Real Prediction Logic
-        input_tensor = preprocess_image(image)
-        metrics = predict_metrics(input_tensor)
+        loop = asyncio.get_running_loop()
+        input_tensor = await loop.run_in_executor(PREPROC_POOL, decode_and_transform, file.file)
+        await file.close()
+        metrics = predict_metrics(await infer(input_tensor))
         
         # 3. Calculate Status
         current_weight = metrics['live_weight']
@@ -234,7 +749,7 @@ async def predict_weight_endpoint(file: UploadFile = File(...)):
         # 5. GENERATE RESPONSE (Format fixed for Flet)
         # We generate a random high confidence score because regression models 
         # don't output probability.
-        simulated_confidence = round(random.uniform(88.0, 99.0), 1)
+        simulated_confidence = draw(CONFIDENCE_POOL)
 
         return {
             "success": True,
@@ -260,4 +775,6 @@ async def predict_weight_endpoint(file: UploadFile = File(...)):
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8008)
\ No newline at end of file
+    # uvicorn needs an import string to spawn workers; a single worker serves
+    # this very app instead of importing the module again as "backend"
+    uvicorn.run("backend:app" if WORKERS > 1 else app, host="0.0.0.0", port=8008, workers=WORKERS)
\ No newline at end of file
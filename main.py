@@ -1,66 +1,167 @@
 import flet as ft
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 import sqlite3
 import hashlib
+import hmac
 import os
-from datetime import datetime
+import threading
+import functools
+import atexit
+from contextlib import contextmanager
+from typing import Final
 import json
+import orjson
 
 # --- CONFIGURATION ---
-API_URL = "http://127.0.0.1:8008/predict"
-DB_PATH = "sheep_app.db"
+API_URL: Final = "http://127.0.0.1:8008/predict"
+DB_PATH: Final = "sheep_app.db"
+# Image types the file picker offers for analysis
+_ALLOWED_EXT: Final = ("jpg", "jpeg", "png")
+
+# --- HTTP CLIENT ---
+# Shared session so scans reuse a keep-alive connection to the backend
+# instead of opening a new TCP (or TLS) connection per upload
+_HTTP = requests.Session()
+_HTTP.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_HTTP.headers.update({"Connection": "keep-alive"})
 
 # --- DATABASE SETUP ---
+# One connection for the whole app instead of reopening the file per query.
+# Flet runs event handlers on worker threads, so access is serialized.
+_CONN = None
+_DB_LOCK = threading.Lock()
+
+# WAL turns each commit into an appended frame instead of a full fsync of the
+# rollback journal. journal_mode persists in the file; the rest are per connection.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=134217728",
+    "PRAGMA foreign_keys=ON",
+)
+
+def get_connection():
+    """Return the shared SQLite connection, opening it on first use"""
+    global _CONN
+    if _CONN is None:
+        # Every helper uses a fixed SQL string, so compiled statements are
+        # served from the connection's statement cache after the first call
+        _CONN = sqlite3.connect(
+            DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=256
+        )
+        for pragma in _PRAGMAS:
+            _CONN.execute(pragma)
+        atexit.register(_CONN.close)
+    return _CONN
+
+@contextmanager
+def db_cursor():
+    """Yield a cursor on the shared connection while holding the DB lock"""
+    with _DB_LOCK:
+        yield get_connection().cursor()
+
+_SCAN_HISTORY_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        weight_kg REAL NOT NULL,
+        confidence REAL NOT NULL,
+        status TEXT NOT NULL,
+        image_name TEXT,
+        scan_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+'''
+
 def init_database():
     """Initialize SQLite database for user authentication and scan history"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # New table for scan history
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS scan_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            weight_kg REAL NOT NULL,
-            confidence REAL NOT NULL,
-            status TEXT NOT NULL,
-            image_name TEXT,
-            scan_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                salt BLOB,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Databases created before salted hashes lack the salt column
+        cursor.execute("PRAGMA table_info(users)")
+        if "salt" not in {column[1] for column in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE users ADD COLUMN salt BLOB")
+        
+        # New table for scan history
+        cursor.execute(_SCAN_HISTORY_SCHEMA.format(table="scan_history"))
+        
+        # Older databases declared the foreign key without ON DELETE CASCADE;
+        # SQLite can't alter a constraint, so rebuild the table once
+        cursor.execute("PRAGMA foreign_key_list(scan_history)")
+        if any(fk[6] != "CASCADE" for fk in cursor.fetchall()):
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute(_SCAN_HISTORY_SCHEMA.format(table="scan_history_new"))
+                # Orphaned rows would violate the now-enforced constraint
+                cursor.execute('''
+                    INSERT INTO scan_history_new
+                    SELECT * FROM scan_history WHERE user_id IN (SELECT id FROM users)
+                ''')
+                cursor.execute("DROP TABLE scan_history")
+                cursor.execute("ALTER TABLE scan_history_new RENAME TO scan_history")
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+        
+        # History and stats queries filter by user and sort/filter by date;
+        # confidence is included so the stats query never touches the table
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_scan_user_date
+            ON scan_history (user_id, scan_date DESC, confidence)
+        ''')
+        
+        # History pages are keyset-paginated on id, so the next page is an
+        # index seek rather than an OFFSET scan
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_scan_user_id
+            ON scan_history (user_id, id)
+        ''')
+
+# Successful logins in this process, so signing in again skips the
+# deliberately slow key derivation. Keyed on an HMAC under a random
+# per-process key: a plain password hash in memory could be brute-forced
+_CACHE_KEY: Final = os.urandom(32)
+_verified_users = {}
 
-def hash_password(password):
-    """Hash password using SHA-256"""
+def _cache_digest(password):
+    """Keyed digest of a password for the in-process login cache"""
+    return hmac.new(_CACHE_KEY, password.encode(), hashlib.sha256).digest()
+
+def hash_password(password, salt):
+    """Derive the password hash with scrypt and a per-user salt"""
+    return hashlib.scrypt(password.encode(), salt=salt, n=2**14, r=8, p=1).hex()
+
+def legacy_hash_password(password):
+    """Unsalted SHA-256 hash used by accounts created before scrypt"""
     return hashlib.sha256(password.encode()).hexdigest()
 
 def create_user(username, email, password):
     """Create a new user account"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        password_hash = hash_password(password)
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-            (username, email, password_hash)
-        )
+        salt = os.urandom(16)
+        password_hash = hash_password(password, salt)
+        with db_cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO users (username, email, password_hash, salt) VALUES (?, ?, ?, ?)",
+                (username, email, password_hash, salt)
+            )
         
-        conn.commit()
-        conn.close()
         return True, "Account created successfully!"
     except sqlite3.IntegrityError:
         return False, "Username or email already exists"
@@ -70,87 +171,116 @@ def create_user(username, email, password):
 def verify_user(email, password):
     """Verify user credentials"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cache_key = (email, _cache_digest(password))
+        if cache_key in _verified_users:
+            return True, dict(_verified_users[cache_key])
         
-        password_hash = hash_password(password)
-        cursor.execute(
-            "SELECT id, username, email FROM users WHERE email = ? AND password_hash = ?",
-            (email, password_hash)
-        )
+        with db_cursor() as cursor:
+            cursor.execute(
+                "SELECT id, username, email, password_hash, salt FROM users WHERE email = ?",
+                (email,)
+            )
+            user = cursor.fetchone()
         
-        user = cursor.fetchone()
-        conn.close()
+        if not user:
+            return False, None
         
-        if user:
-            return True, {"id": user[0], "username": user[1], "email": user[2]}
-        else:
+        user_id, username, user_email, stored_hash, salt = user
+        if salt is None:
+            # Legacy account: check the old hash, then upgrade it to scrypt
+            if not hmac.compare_digest(legacy_hash_password(password), stored_hash):
+                return False, None
+            salt = os.urandom(16)
+            with db_cursor() as cursor:
+                cursor.execute(
+                    "UPDATE users SET password_hash = ?, salt = ? WHERE id = ?",
+                    (hash_password(password, salt), salt, user_id)
+                )
+        elif not hmac.compare_digest(hash_password(password, salt), stored_hash):
             return False, None
+        
+        user_data = {"id": user_id, "username": username, "email": user_email}
+        _verified_users[cache_key] = user_data
+        return True, dict(user_data)
     except Exception as e:
         return False, None
 
-def save_scan_result(user_id, weight_kg, confidence, status, image_name):
-    """Save scan result to database"""
+# Bumped on every scan write; cached history/stats reads are keyed on it so
+# they are only re-queried after something changed
+_cache_epoch = 0
+
+def save_scan_results_batch(user_id, rows):
+    """Save (weight_kg, confidence, status, image_name) rows in one transaction"""
+    global _cache_epoch
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "INSERT INTO scan_history (user_id, weight_kg, confidence, status, image_name) VALUES (?, ?, ?, ?, ?)",
-            (user_id, weight_kg, confidence, status, image_name)
-        )
+        with db_cursor() as cursor:
+            # The connection is in autocommit mode, so open the transaction explicitly
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(
+                    "INSERT INTO scan_history (user_id, weight_kg, confidence, status, image_name) VALUES (?, ?, ?, ?, ?)",
+                    [(user_id, *row) for row in rows]
+                )
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            _cache_epoch += 1
         
-        conn.commit()
-        conn.close()
         return True
     except Exception as e:
         print(f"Error saving scan result: {e}")
         return False
 
-def get_user_scans(user_id, limit=10):
-    """Retrieve user's scan history"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
+def save_scan_result(user_id, weight_kg, confidence, status, image_name):
+    """Save scan result to database"""
+    return save_scan_results_batch(user_id, [(weight_kg, confidence, status, image_name)])
+
+@functools.lru_cache(maxsize=32)
+def _query_user_scans(user_id, limit, before_id, epoch):
+    with db_cursor() as cursor:
         cursor.execute(
-            """SELECT id, weight_kg, confidence, status, image_name, scan_date 
+            # SQLite's strftime has no %b, so the month abbreviation is sliced
+            # out of a lookup string; renders as e.g. "Mar 07, 2025"
+            """SELECT id, weight_kg, confidence, status, image_name,
+                      COALESCE(substr('JanFebMarAprMayJunJulAugSepOctNovDec',
+                                      strftime('%m', scan_date) * 3 - 2, 3)
+                               || strftime(' %d, %Y', scan_date), scan_date) AS date_str
                FROM scan_history 
-               WHERE user_id = ? 
-               ORDER BY scan_date DESC 
+               WHERE user_id = ? AND (? IS NULL OR id < ?)
+               ORDER BY id DESC 
                LIMIT ?""",
-            (user_id, limit)
+            (user_id, before_id, before_id, limit)
         )
-        
-        scans = cursor.fetchall()
-        conn.close()
-        return scans
+        return tuple(cursor.fetchall())
+
+def get_user_scans(user_id, limit=10, before_id=None):
+    """Retrieve user's scan history, newest first, older than before_id if given"""
+    try:
+        return list(_query_user_scans(user_id, limit, before_id, _cache_epoch))
     except Exception as e:
         print(f"Error retrieving scans: {e}")
         return []
 
-def get_user_stats(user_id):
-    """Get user statistics"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Total scans
-        cursor.execute("SELECT COUNT(*) FROM scan_history WHERE user_id = ?", (user_id,))
-        total_scans = cursor.fetchone()[0]
-        
-        # Average confidence
-        cursor.execute("SELECT AVG(confidence) FROM scan_history WHERE user_id = ?", (user_id,))
-        avg_confidence = cursor.fetchone()[0] or 0
-        
-        # This week scans
+@functools.lru_cache(maxsize=32)
+def _query_user_stats(user_id, epoch):
+    with db_cursor() as cursor:
+        # Total scans, average confidence and this week's scans in one pass
         cursor.execute(
-            "SELECT COUNT(*) FROM scan_history WHERE user_id = ? AND scan_date >= date('now', '-7 days')",
+            """SELECT COUNT(*),
+                      COALESCE(AVG(confidence), 0),
+                      COALESCE(SUM(CASE WHEN scan_date >= date('now', '-7 days') THEN 1 ELSE 0 END), 0)
+               FROM scan_history
+               WHERE user_id = ?""",
             (user_id,)
         )
-        week_scans = cursor.fetchone()[0]
+        return cursor.fetchone()
+
+def get_user_stats(user_id):
+    """Get user statistics"""
+    try:
+        total_scans, avg_confidence, week_scans = _query_user_stats(user_id, _cache_epoch)
         
-        conn.close()
         return {
             "total_scans": total_scans,
             "avg_confidence": round(avg_confidence, 1),
@@ -160,6 +290,79 @@ def get_user_stats(user_id):
         print(f"Error getting stats: {e}")
         return {"total_scans": 0, "avg_confidence": 0, "week_scans": 0}
 
+# --- Premium Design System ---
+# Built once at import; every view shares these objects.
+NEON_CYAN: Final = "#00FFD1"
+ELECTRIC_BLUE: Final = "#0EA5E9"
+VIVID_PURPLE: Final = "#A855F7"
+HOT_PINK: Final = "#EC4899"
+LIME_GREEN: Final = "#84CC16"
+
+DARK_BG: Final = "#0F1419"
+CARD_BG: Final = "#1A1F2E"
+SURFACE: Final = "#141B26"
+WHITE: Final = "#FFFFFF"
+TEXT_PRIMARY: Final = "#F1F5F9"
+TEXT_SECONDARY: Final = "#94A3B8"
+TEXT_MUTED: Final = "#64748B"
+BORDER_COLOR: Final = "#2D3748"
+
+CYAN_GLOW: Final = ft.LinearGradient(
+    begin=ft.alignment.top_left,
+    end=ft.alignment.bottom_right,
+    colors=["#00FFD1", "#0EA5E9", "#3B82F6"]
+)
+PURPLE_GLOW: Final = ft.LinearGradient(
+    begin=ft.alignment.top_left,
+    end=ft.alignment.bottom_right,
+    colors=["#A855F7", "#EC4899", "#F97316"]
+)
+MESH_GRADIENT: Final = ft.LinearGradient(
+    begin=ft.alignment.top_left,
+    end=ft.alignment.bottom_right,
+    colors=["#1A1F2E", "#141B26", "#0F1419"]
+)
+LIME_GLOW: Final = ft.LinearGradient(
+    begin=ft.alignment.top_left,
+    end=ft.alignment.bottom_right,
+    colors=["#84CC16", "#22C55E"]
+)
+
+CARD_SHADOW: Final = [
+    ft.BoxShadow(blur_radius=30, color="#00000040", offset=ft.Offset(0, 10), spread_radius=-5),
+    ft.BoxShadow(blur_radius=60, color="#00FFD120", offset=ft.Offset(0, 20), spread_radius=-10)
+]
+BUTTON_SHADOW: Final = [
+    ft.BoxShadow(blur_radius=25, color="#00FFD140", offset=ft.Offset(0, 8), spread_radius=0)
+]
+GLOW_EFFECT: Final = [
+    ft.BoxShadow(blur_radius=40, color="#00FFD130", offset=ft.Offset(0, 0), spread_radius=0)
+]
+CYAN_BORDER: Final = ft.border.all(1, "#00FFD130")
+
+# Border/margin/padding values repeated across views. They are plain value
+# objects (not controls), so one instance can back every container.
+_BORDER_1: Final = ft.border.all(1, BORDER_COLOR)
+_BORDER_CARD: Final = ft.border.all(1, "#FFFFFF08")
+_BORDER_ERR: Final = ft.border.all(1, "#EF444430")
+_MARGIN_STATS: Final = ft.margin.only(top=-60, left=24, right=24)
+_MARGIN_ICON: Final = ft.margin.only(right=26)
+_MARGIN_CARD: Final = ft.margin.only(bottom=14)
+_BADGE_PADDING: Final = ft.padding.symmetric(horizontal=10, vertical=5)
+_HEADER_PADDING: Final = ft.padding.only(left=28, top=98, right=28, bottom=28)
+_SECTION_PADDING: Final = ft.padding.only(left=24, top=58, right=24, bottom=24)
+_LOCKED_PADDING: Final = ft.padding.only(left=24, top=184, right=24, bottom=24)
+_NAV_TOP_BORDER: Final = ft.border.only(top=ft.BorderSide(1, BORDER_COLOR))
+
+# Navigation tabs as (icon, selected_icon, label), in switch_tab index order.
+# Kept as plain data: controls belong to one page, so each session builds its own.
+_NAV_DESTINATIONS: Final = (
+    ("home_outlined", "home", "Home"),
+    ("camera_alt_outlined", "camera_alt", "Analyze"),
+    ("history", None, "History"),
+    ("person_outline", "person", "Account"),
+)
+
 def main(page: ft.Page):
     # Initialize database
     init_database()
@@ -175,89 +378,75 @@ def main(page: ft.Page):
 
     # --- 2. Session State ---
     current_user = {"logged_in": False, "data": None}
+    # (user_id, _cache_epoch) the views were last built from
+    loaded_data_key = [None]
+    # Next history page fetched ahead of the scroll: (user_id, before_id, rows)
+    _history_prefetch = [None]
     user_stats = {"total_scans": 0, "avg_confidence": 0, "week_scans": 0}
     scan_history = []
 
-    # --- 3. Premium Design System ---
-    NEON_CYAN = "#00FFD1"
-    ELECTRIC_BLUE = "#0EA5E9"
-    VIVID_PURPLE = "#A855F7"
-    HOT_PINK = "#EC4899"
-    LIME_GREEN = "#84CC16"
-    
-    DARK_BG = "#0F1419"
-    CARD_BG = "#1A1F2E"
-    SURFACE = "#141B26"
-    WHITE = "#FFFFFF"
-    TEXT_PRIMARY = "#F1F5F9"
-    TEXT_SECONDARY = "#94A3B8"
-    TEXT_MUTED = "#64748B"
-    BORDER_COLOR = "#2D3748"
-    
-    CYAN_GLOW = ft.LinearGradient(
-        begin=ft.alignment.top_left,
-        end=ft.alignment.bottom_right,
-        colors=["#00FFD1", "#0EA5E9", "#3B82F6"]
-    )
-    PURPLE_GLOW = ft.LinearGradient(
-        begin=ft.alignment.top_left,
-        end=ft.alignment.bottom_right,
-        colors=["#A855F7", "#EC4899", "#F97316"]
-    )
-    MESH_GRADIENT = ft.LinearGradient(
-        begin=ft.alignment.top_left,
-        end=ft.alignment.bottom_right,
-        colors=["#1A1F2E", "#141B26", "#0F1419"]
-    )
-    
-    CARD_SHADOW = [
-        ft.BoxShadow(blur_radius=30, color="#00000040", offset=ft.Offset(0, 10), spread_radius=-5),
-        ft.BoxShadow(blur_radius=60, color="#00FFD120", offset=ft.Offset(0, 20), spread_radius=-10)
-    ]
-    BUTTON_SHADOW = [
-        ft.BoxShadow(blur_radius=25, color="#00FFD140", offset=ft.Offset(0, 8), spread_radius=0)
-    ]
-    GLOW_EFFECT = [
-        ft.BoxShadow(blur_radius=40, color="#00FFD130", offset=ft.Offset(0, 0), spread_radius=0)
-    ]
-
-    # --- 4. LOGIC & STATE ---
+    # --- 3. LOGIC & STATE ---
     result_text = ft.Text("Ready to scan", size=32, weight="bold", color=NEON_CYAN)
     details_text = ft.Text("Select an image to start analysis", size=15, color=TEXT_SECONDARY)
     loading_ring = ft.ProgressRing(visible=False, width=40, height=40, color=NEON_CYAN, stroke_width=4)
 
+    # One SnackBar for status messages; each message just re-arms it
+    status_snack_text = ft.Text(color=WHITE, weight="bold")
+    status_snack = ft.SnackBar(status_snack_text, behavior=ft.SnackBarBehavior.FLOATING)
+    page.overlay.append(status_snack)
+
+    def arm_snack(message, bgcolor):
+        """Queue a SnackBar message; it shows on the caller's next page.update()"""
+        status_snack_text.value = message
+        status_snack.bgcolor = bgcolor
+        status_snack.open = True
+
+    # Widgets that show user data. refresh_user_data mutates these in place
+    # instead of rebuilding the Home/History views around them.
+    GUEST_STATS = {"total_scans": 542, "avg_confidence": 95, "week_scans": 12}
+    total_scans_text = ft.Text(size=28, weight="bold", color=TEXT_PRIMARY)
+    avg_conf_text = ft.Text(size=28, weight="bold", color=TEXT_PRIMARY)
+    week_scans_text = ft.Text(size=28, weight="bold", color=TEXT_PRIMARY)
+    history_count_text = ft.Text(size=15, color=TEXT_SECONDARY)
+    account_scans_text = ft.Text(weight="bold", size=24, color=TEXT_PRIMARY)
+    account_conf_text = ft.Text(weight="bold", size=24, color=TEXT_PRIMARY)
+    account_week_text = ft.Text(weight="bold", size=24, color=TEXT_PRIMARY)
+    history_column = ft.Column()
+
     def process_upload(file_path):
         """Enhanced backend communication with better error handling"""
+        image_name = os.path.basename(file_path)
         try:
-            # Check if file exists
-            if not os.path.exists(file_path):
-                return {"success": False, "error": "File not found"}
-            
-            # Open and send file
+            # Open and send file; a missing file surfaces as FileNotFoundError
             with open(file_path, "rb") as f:
-                files = {"file": (os.path.basename(file_path), f, "image/jpeg")}
+                files = {"file": (image_name, f, "image/jpeg")}
                 
                 # Make request with timeout
-                response = requests.post(API_URL, files=files, timeout=10)
+                response = _HTTP.post(API_URL, files=files, timeout=10)
             
             # Check response status
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
+                
+                if not data.get("success", False):
+                    return {"success": False, "error": data.get("error", "Unknown error")}
                 
-                # Validate response structure
-                if data.get("success", False):
+                # A successful prediction always carries these fields
+                try:
                     return {
                         "success": True,
-                        "weight_kg": data.get("weight_kg", 0),
-                        "confidence": data.get("confidence", 0),
-                        "status": data.get("status", "Unknown"),
-                        "image_name": os.path.basename(file_path)
+                        "weight_kg": data["weight_kg"],
+                        "confidence": data["confidence"],
+                        "status": data["status"],
+                        "image_name": image_name
                     }
-                else:
-                    return {"success": False, "error": data.get("error", "Unknown error")}
+                except KeyError as k:
+                    return {"success": False, "error": f"Malformed response: missing {k}"}
             else:
                 return {"success": False, "error": f"Server error: {response.status_code}"}
                 
+        except FileNotFoundError:
+            return {"success": False, "error": "File not found"}
         except requests.exceptions.Timeout:
             return {"success": False, "error": "Request timeout - server took too long"}
         except requests.exceptions.ConnectionError:
@@ -273,86 +462,139 @@ def main(page: ft.Page):
             result_text.value = "Analyzing..."
             details_text.value = "AI is processing your image..."
             loading_ring.visible = True
-            page.update()
+            page.update(result_text, details_text, loading_ring)
 
-            # Process the upload
-            result = process_upload(file_path)
+            # Upload on a background thread so the UI stays responsive
+            # while the backend works (up to the 10s request timeout)
+            page.run_thread(analyze_image, file_path)
+
+    def analyze_image(file_path):
+        """Send the image to the backend and show the result (background thread)"""
+        # Process the upload
+        result = process_upload(file_path)
+        
+        # Hide loading indicator
+        loading_ring.visible = False
+        
+        if result.get("success"):
+            # Extract data
+            weight = result["weight_kg"]
+            confidence = result["confidence"]
+            status = result["status"]
+            image_name = result["image_name"]
             
-            # Hide loading indicator
-            loading_ring.visible = False
+            # Update UI with results
+            result_text.value = f"{weight} kg"
+            details_text.value = f"{status} • {confidence}% Confidence"
             
-            if result.get("success"):
-                # Extract data
-                weight = result["weight_kg"]
-                confidence = result["confidence"]
-                status = result["status"]
-                image_name = result["image_name"]
-                
-                # Update UI with results
-                result_text.value = f"{weight} kg"
-                details_text.value = f"{status} • {confidence}% Confidence"
-                
-                # Save to database if user is logged in
-                if current_user["logged_in"]:
-                    save_scan_result(
-                        current_user["data"]["id"],
-                        weight,
-                        confidence,
-                        status,
-                        image_name
-                    )
-                    
-                    # Refresh stats and history
-                    refresh_user_data()
-                
-                # Show success notification
-                page.open(ft.SnackBar(
-                    ft.Text("✓ Analysis Complete", color=WHITE, weight="bold"),
-                    bgcolor="#10B981",
-                    behavior=ft.SnackBarBehavior.FLOATING
-                ))
-            else:
-                # Handle error
-                error_msg = result.get("error", "Unknown error")
-                result_text.value = "Analysis Failed"
-                details_text.value = error_msg
+            # Save to database if user is logged in
+            if current_user["logged_in"]:
+                save_scan_result(
+                    current_user["data"]["id"],
+                    weight,
+                    confidence,
+                    status,
+                    image_name
+                )
                 
-                # Show error notification
-                page.open(ft.SnackBar(
-                    ft.Text(f"✗ {error_msg}", color=WHITE, weight="bold"),
-                    bgcolor="#EF4444",
-                    behavior=ft.SnackBarBehavior.FLOATING
-                ))
+                # Refresh stats and history; flushed with the result below
+                refresh_user_data(update=False)
             
-            page.update()
+            # Show success notification
+            arm_snack("✓ Analysis Complete", "#10B981")
+        else:
+            # Handle error
+            error_msg = result.get("error", "Unknown error")
+            result_text.value = "Analysis Failed"
+            details_text.value = error_msg
+            
+            # Show error notification
+            arm_snack(f"✗ {error_msg}", "#EF4444")
+        
+        # Result, refreshed stats/history and the SnackBar go out in one update
+        page.update()
 
     file_picker = ft.FilePicker(on_result=on_file_picked)
     page.overlay.append(file_picker)
 
-    def refresh_user_data():
+    def refresh_user_data(update=True):
         """Refresh user statistics and scan history"""
         if current_user["logged_in"]:
+            # Nothing was saved since the last refresh for this user
+            data_key = (current_user["data"]["id"], _cache_epoch)
+            if data_key == loaded_data_key[0]:
+                return
+            loaded_data_key[0] = data_key
+            
             nonlocal user_stats, scan_history
             user_stats = get_user_stats(current_user["data"]["id"])
             scan_history = get_user_scans(current_user["data"]["id"])
-            build_home()
-            build_history()
-            page.update()
+            prefetch_history()
+            update_stats_widgets()
+            update_history_widgets()
+            if update:
+                page.update()
 
-    # --- 5. PREMIUM UI COMPONENTS ---
+    def update_stats_widgets():
+        """Show the current user's stats (or the guest showcase) on Home and Account"""
+        stats = user_stats if current_user["logged_in"] else GUEST_STATS
+        total_scans_text.value = account_scans_text.value = str(stats["total_scans"])
+        avg_conf_text.value = account_conf_text.value = f"{stats['avg_confidence']}%"
+        week_scans_text.value = account_week_text.value = str(stats["week_scans"])
+
+    def update_history_widgets():
+        """Rebuild only the history list items from scan_history"""
+        history_count_text.value = f"{user_stats['total_scans']} total scans"
+        history_column.controls[:] = build_history_items()
+
+    def prefetch_history():
+        """Fetch the page after the last loaded scan on a background thread"""
+        _history_prefetch[0] = None
+        if not current_user["logged_in"] or not scan_history:
+            return
+        key = (current_user["data"]["id"], scan_history[-1][0])
+        
+        def fetch():
+            rows = get_user_scans(key[0], before_id=key[1])
+            _history_prefetch[0] = (*key, rows)
+        
+        threading.Thread(target=fetch, daemon=True).start()
+
+    def load_more_history():
+        """Append the next page of older scans to the history list"""
+        if not current_user["logged_in"] or not scan_history:
+            return
+        key = (current_user["data"]["id"], scan_history[-1][0])
+        prefetched = _history_prefetch[0]
+        if prefetched is not None and prefetched[:2] == key:
+            rows = prefetched[2]
+        else:
+            rows = get_user_scans(key[0], before_id=key[1])
+        if not rows:
+            return
+        scan_history.extend(rows)
+        history_column.controls.extend(_history_card(scan) for scan in rows)
+        prefetch_history()
+        page.update()
+
+    def on_history_scroll(e):
+        if e.event_type == "end" and e.pixels >= e.max_scroll_extent - 50:
+            load_more_history()
+
+    # --- 4. PREMIUM UI COMPONENTS ---
     
     def _premium_card(content, gradient=None, has_glow=False, padding=30):
         return ft.Container(
             content=content,
             bgcolor=CARD_BG if not gradient else None,
             gradient=gradient,
-            border=ft.border.all(1, "#FFFFFF08"),
+            border=_BORDER_CARD,
             border_radius=28,
             padding=padding,
             shadow=CARD_SHADOW if has_glow else [CARD_SHADOW[0]]
         )
 
-    def _stat_card(icon, value, label, color, gradient):
+    def _stat_card(icon, value_text, label, color, gradient):
         return ft.Container(
             content=ft.Column([
                 ft.Container(
@@ -360,14 +602,14 @@ def main(page: ft.Page):
                     gradient=gradient,
                     padding=18,
                     border_radius=20,
-                    shadow=GLOW_EFFECT
+                    shadow=GLOW_EFFECT,
+                    margin=ft.margin.only(bottom=12)
                 ),
-                ft.Container(height=12),
-                ft.Text(str(value), size=28, weight="bold", color=TEXT_PRIMARY),
+                value_text,
                 ft.Text(label, size=13, color=TEXT_SECONDARY, weight="w500")
             ], horizontal_alignment="center", spacing=0),
             bgcolor=SURFACE,
-            border=ft.border.all(1, BORDER_COLOR),
+            border=_BORDER_1,
             border_radius=24,
             padding=20,
             expand=True
@@ -379,7 +621,7 @@ def main(page: ft.Page):
             badge_widget = ft.Container(
                 content=ft.Text(badge, size=10, weight="bold", color=DARK_BG),
                 bgcolor=NEON_CYAN,
-                padding=ft.padding.symmetric(horizontal=10, vertical=5),
+                padding=_BADGE_PADDING,
                 border_radius=12
             )
         
@@ -388,11 +630,11 @@ def main(page: ft.Page):
                 ft.Container(
                     content=ft.Icon(icon, size=26, color=NEON_CYAN),
                     bgcolor="#00FFD115",
-                    border=ft.border.all(1, "#00FFD130"),
+                    border=CYAN_BORDER,
                     padding=16,
-                    border_radius=18
+                    border_radius=18,
+                    margin=_MARGIN_ICON
                 ),
-                ft.Container(width=16),
                 ft.Column([
                     ft.Text(title, weight="w600", size=16, color=TEXT_PRIMARY),
                     ft.Text(subtitle, size=13, color=TEXT_SECONDARY)
@@ -400,19 +642,23 @@ def main(page: ft.Page):
                 badge_widget if badge else ft.Icon("chevron_right", size=22, color=TEXT_MUTED)
             ], alignment="center"),
             bgcolor=SURFACE,
-            border=ft.border.all(1, BORDER_COLOR),
+            border=_BORDER_1,
             border_radius=20,
             padding=20,
-            margin=ft.margin.only(bottom=14)
+            margin=_MARGIN_CARD
         )
 
+    # Constant menu rows (Home features, Account settings) are built once and
+    # handed back on every rebuild; each lives in only one view, and that view
+    # drops its old tree when rebuilt, so an instance is never mounted twice
+    _static_feature_card = functools.lru_cache(maxsize=16)(_feature_card)
+
     def _action_button(text, icon, gradient, on_click, is_primary=True):
         return ft.Container(
             content=ft.Row([
                 ft.Icon(icon, color=WHITE if is_primary else TEXT_PRIMARY, size=26),
-                ft.Container(width=12),
                 ft.Text(text, color=WHITE if is_primary else TEXT_PRIMARY, weight="bold", size=17)
-            ], alignment="center"),
+            ], alignment="center", spacing=32),
             gradient=gradient if is_primary else None,
             bgcolor=SURFACE if not is_primary else None,
             border=ft.border.all(1.5, BORDER_COLOR) if not is_primary else None,
@@ -422,7 +668,7 @@ def main(page: ft.Page):
             on_click=on_click
         )
 
-    # --- 6. VIEW CONTAINERS ---
+    # --- 5. VIEW CONTAINERS ---
     home_view = ft.Container(expand=True)
     analyze_view = ft.Container(expand=True)
     history_view = ft.Container(expand=True)
@@ -430,6 +676,11 @@ def main(page: ft.Page):
 
     # Authentication State
     is_login_mode = [True]
+    # Set while a sign-in/sign-up is being processed; extra submits are dropped
+    _auth_inflight = [False]
+    # Views whose layout is stale after a login/logout; switch_tab rebuilds
+    # each one on its next visit instead of all of them up front
+    _dirty = {"home": True, "analyze": True, "history": True, "auth": True}
 
     def handle_logout():
         current_user["logged_in"] = False
@@ -439,49 +690,39 @@ def main(page: ft.Page):
         nonlocal user_stats, scan_history
         user_stats = {"total_scans": 0, "avg_confidence": 0, "week_scans": 0}
         scan_history = []
+        loaded_data_key[0] = None
         
-        # Rebuild all views
-        build_home()
-        build_analyze()
-        build_auth()
-        build_history()
+        # Rebuild views lazily
+        _dirty.update(home=True, analyze=True, history=True, auth=True)
         
         # Go to home screen
-        switch_tab(0)
-        
-        page.open(ft.SnackBar(
-            ft.Text("✓ Logged out successfully", color=WHITE, weight="bold"),
-            bgcolor="#10B981",
-            behavior=ft.SnackBarBehavior.FLOATING
-        ))
+        switch_tab(0, update=False)
+        arm_snack("✓ Logged out successfully", "#10B981")
         page.update()
 
     # Build Home View
     def build_home():
-        stats = user_stats if current_user["logged_in"] else {"total_scans": 542, "avg_confidence": 95, "week_scans": 12}
+        update_stats_widgets()
         
         home_view.content = ft.Column([
             ft.Container(
                 content=ft.Column([
-                    ft.Container(height=60),
                     ft.Row([
                         ft.Column([
                             ft.Row([
                                 ft.Text("👋", size=24),
                                 ft.Text("Welcome back" if current_user["logged_in"] else "Welcome", color=TEXT_SECONDARY, size=14, weight="w500")
                             ], spacing=8),
-                            ft.Container(height=4),
                             ft.Text(current_user["data"]["username"] if current_user["logged_in"] else "Guest", color=TEXT_PRIMARY, size=32, weight="bold")
-                        ], spacing=0),
+                        ], spacing=4),
                         ft.Container(
                             content=ft.Icon("notifications_outlined", color=NEON_CYAN, size=26),
                             bgcolor="#00FFD115",
-                            border=ft.border.all(1, "#00FFD130"),
+                            border=CYAN_BORDER,
                             padding=14,
                             border_radius=16
                         )
                     ], alignment="spaceBetween"),
-                    ft.Container(height=24),
                     ft.Container(
                         content=ft.Row([
                             ft.Icon("auto_awesome", size=16, color=DARK_BG),
@@ -491,20 +732,16 @@ def main(page: ft.Page):
                         padding=ft.padding.symmetric(horizontal=16, vertical=8),
                         border_radius=20
                     )
-                ]),
-                padding=28,
+                ], spacing=44),
+                padding=_HEADER_PADDING,
                 gradient=MESH_GRADIENT
             ),
             
             ft.Container(
                 content=ft.Row([
-                    _stat_card("insights", stats["total_scans"], "Total Scans", ELECTRIC_BLUE, CYAN_GLOW),
-                    _stat_card("verified", f"{stats['avg_confidence']}%", "Accuracy", LIME_GREEN, ft.LinearGradient(
-                        begin=ft.alignment.top_left,
-                        end=ft.alignment.bottom_right,
-                        colors=["#84CC16", "#22C55E"]
-                    )),
-                    _stat_card("trending_up", stats["week_scans"], "This Week", VIVID_PURPLE, PURPLE_GLOW)
+                    _stat_card("insights", total_scans_text, "Total Scans", ELECTRIC_BLUE, CYAN_GLOW),
+                    _stat_card("verified", avg_conf_text, "Accuracy", LIME_GREEN, LIME_GLOW),
+                    _stat_card("trending_up", week_scans_text, "This Week", VIVID_PURPLE, PURPLE_GLOW)
                 ], spacing=14),
                 padding=ft.padding.symmetric(horizontal=24, vertical=16)
             ),
@@ -515,18 +752,16 @@ def main(page: ft.Page):
                         ft.Row([
                             ft.Column([
                                 ft.Text("Quick Analysis", size=26, weight="bold", color=TEXT_PRIMARY),
-                                ft.Container(height=8),
                                 ft.Text("Instant AI predictions in seconds", size=15, color=TEXT_SECONDARY)
-                            ], expand=True),
+                            ], spacing=28, expand=True),
                             ft.Container(
                                 content=ft.Icon("auto_awesome", color=NEON_CYAN, size=32),
                                 padding=16,
                                 border_radius=18,
                                 bgcolor="#00FFD115",
-                                border=ft.border.all(1, "#00FFD130")
+                                border=CYAN_BORDER
                             )
                         ], alignment="start"),
-                        ft.Container(height=24),
                         ft.Container(
                             content=ft.Text("Start Analysis" if current_user["logged_in"] else "Sign In to Analyze", weight="bold", color=WHITE, size=17),
                             gradient=CYAN_GLOW,
@@ -536,22 +771,21 @@ def main(page: ft.Page):
                             alignment=ft.alignment.center,
                             on_click=lambda e: switch_tab(1) if current_user["logged_in"] else switch_tab(3)
                         )
-                    ])
+                    ], spacing=44)
                 ),
                 padding=ft.padding.symmetric(horizontal=24)
             ),
             
-            ft.Container(height=24),
-            
             ft.Container(
                 content=ft.Column([
                     ft.Text("Features", size=22, weight="bold", color=TEXT_PRIMARY),
-                    ft.Container(height=16),
-                    _feature_card("straighten", "Body Measurements", "Auto-extract dimensions", "NEW"),
-                    _feature_card("assessment", "CT Data Integration", "Sync with database"),
-                    _feature_card("analytics", "Performance Analytics", "Track farm metrics"),
-                ]),
-                padding=24
+                    ft.Column([
+                        _static_feature_card("straighten", "Body Measurements", "Auto-extract dimensions", "NEW"),
+                        _static_feature_card("assessment", "CT Data Integration", "Sync with database"),
+                        _static_feature_card("analytics", "Performance Analytics", "Track farm metrics"),
+                    ])
+                ], spacing=36),
+                padding=_SECTION_PADDING
             )
         ], scroll="auto", expand=True)
 
@@ -559,16 +793,14 @@ def main(page: ft.Page):
     def build_analyze():
         if not current_user["logged_in"]:
             analyze_view.content = ft.Column([
-                ft.Container(height=150),
                 ft.Container(
                     content=_premium_card(
                         ft.Column([
                             ft.Icon("lock_outline", size=80, color=TEXT_MUTED),
-                            ft.Container(height=24),
-                            ft.Text("Authentication Required", size=28, weight="bold", color=TEXT_PRIMARY, text_align="center"),
-                            ft.Container(height=12),
-                            ft.Text("Please sign in to use the analysis feature", size=15, color=TEXT_SECONDARY, text_align="center"),
-                            ft.Container(height=32),
+                            ft.Column([
+                                ft.Text("Authentication Required", size=28, weight="bold", color=TEXT_PRIMARY, text_align="center"),
+                                ft.Text("Please sign in to use the analysis feature", size=15, color=TEXT_SECONDARY, text_align="center"),
+                            ], horizontal_alignment="center", spacing=32),
                             ft.Container(
                                 content=ft.Text("Go to Sign In", weight="bold", color=WHITE, size=17),
                                 gradient=CYAN_GLOW,
@@ -576,43 +808,36 @@ def main(page: ft.Page):
                                 border_radius=18,
                                 shadow=BUTTON_SHADOW,
                                 alignment=ft.alignment.center,
+                                margin=ft.margin.only(top=8),
                                 on_click=lambda e: switch_tab(3)
                             )
-                        ], horizontal_alignment="center")
+                        ], horizontal_alignment="center", spacing=44)
                     ),
-                    padding=24
+                    padding=_LOCKED_PADDING
                 )
             ], horizontal_alignment="center", expand=True)
             return
         
         analyze_view.content = ft.Column([
-            ft.Container(height=60),
-            
             ft.Container(
-                padding=28,
+                padding=_HEADER_PADDING,
                 content=ft.Column([
                     ft.Text("🎯 New Analysis", size=36, weight="bold", color=TEXT_PRIMARY),
-                    ft.Container(height=8),
                     ft.Text("Select a photo to get instant AI predictions", size=15, color=TEXT_SECONDARY)
-                ], spacing=0)
+                ], spacing=8)
             ),
             
-            ft.Container(height=8),
-            
             ft.Container(
                 content=_premium_card(
                     ft.Column([
                         ft.Text("PREDICTION RESULT", size=12, weight="bold", color=TEXT_MUTED),
-                        ft.Container(height=20),
                         ft.Row([
                             ft.Column([
                                 result_text,
-                                ft.Container(height=8),
                                 details_text
-                            ], expand=True),
+                            ], spacing=28, expand=True),
                             loading_ring
                         ], alignment="spaceBetween", vertical_alignment="center"),
-                        ft.Container(height=20),
                         ft.Container(
                             content=ft.Row([
                                 ft.Icon("info_outline", size=16, color=ELECTRIC_BLUE),
@@ -623,24 +848,21 @@ def main(page: ft.Page):
                             padding=14,
                             border_radius=14
                         )
-                    ]),
+                    ], spacing=40),
                     has_glow=True
                 ),
                 padding=24
             ),
             
-            ft.Container(height=32),
-            
             ft.Container(
                 content=ft.Column([
                     _action_button(
                         "Select Image",
                         "collections",
                         CYAN_GLOW,
-                        lambda _: file_picker.pick_files(allow_multiple=False, allowed_extensions=["jpg", "jpeg", "png"]),
+                        lambda _: file_picker.pick_files(allow_multiple=False, allowed_extensions=_ALLOWED_EXT),
                         is_primary=True
                     ),
-                    ft.Container(height=16),
                     ft.Container(
                         content=ft.Row([
                             ft.Icon("check_circle", size=16, color=LIME_GREEN),
@@ -651,162 +873,155 @@ def main(page: ft.Page):
                         padding=14,
                         border_radius=14
                     )
-                ]),
-                padding=24
+                ], spacing=36),
+                padding=ft.padding.only(left=24, top=48, right=24, bottom=24)
             )
-        ], scroll="auto", expand=True)
+        ], scroll="auto", expand=True, spacing=28)
+
+    # Build History list items
+    def _history_card(scan):
+        scan_id, weight, confidence, status, image_name, date_str = scan
+        return _feature_card(
+            "pets",
+            f"Scan #{scan_id}",
+            f"{date_str} • {weight}kg • {confidence}% confidence",
+            status
+        )
+
+    def build_history_items():
+        """Build the history list controls from scan_history"""
+        history_items = [_history_card(scan) for scan in scan_history]
+        
+        if not history_items:
+            history_items = [
+                ft.Container(
+                    content=ft.Column([
+                        ft.Icon("inbox", size=60, color=TEXT_MUTED),
+                        ft.Column([
+                            ft.Text("No scans yet", size=18, weight="bold", color=TEXT_PRIMARY),
+                            ft.Text("Start analyzing to build your history", size=14, color=TEXT_SECONDARY)
+                        ], horizontal_alignment="center"),
+                    ], horizontal_alignment="center", spacing=36),
+                    padding=40
+                )
+            ]
+        return history_items
 
     # Build History View
     def build_history():
         if not current_user["logged_in"]:
             history_view.content = ft.Column([
-                ft.Container(height=150),
                 ft.Container(
                     content=_premium_card(
                         ft.Column([
                             ft.Icon("history", size=80, color=TEXT_MUTED),
-                            ft.Container(height=24),
-                            ft.Text("No History Available", size=28, weight="bold", color=TEXT_PRIMARY, text_align="center"),
-                            ft.Container(height=12),
-                            ft.Text("Sign in to view your scan history", size=15, color=TEXT_SECONDARY, text_align="center"),
-                        ], horizontal_alignment="center")
+                            ft.Column([
+                                ft.Text("No History Available", size=28, weight="bold", color=TEXT_PRIMARY, text_align="center"),
+                                ft.Text("Sign in to view your scan history", size=15, color=TEXT_SECONDARY, text_align="center"),
+                            ], horizontal_alignment="center", spacing=32),
+                        ], horizontal_alignment="center", spacing=44)
                     ),
-                    padding=24
+                    padding=_LOCKED_PADDING
                 )
             ], horizontal_alignment="center", expand=True)
             return
         
-        # Build history items from database
-        history_items = []
-        for scan in scan_history:
-            scan_id, weight, confidence, status, image_name, scan_date = scan
-            
-            # Parse date
-            try:
-                dt = datetime.strptime(scan_date, "%Y-%m-%d %H:%M:%S")
-                date_str = dt.strftime("%b %d, %Y")
-            except:
-                date_str = scan_date
-            
-            history_items.append(
-                _feature_card(
-                    "pets",
-                    f"Scan #{scan_id}",
-                    f"{date_str} • {weight}kg • {confidence}% confidence",
-                    status
-                )
-            )
-        
-        if not history_items:
-            history_items = [
-                ft.Container(
-                    content=ft.Column([
-                        ft.Icon("inbox", size=60, color=TEXT_MUTED),
-                        ft.Container(height=16),
-                        ft.Text("No scans yet", size=18, weight="bold", color=TEXT_PRIMARY),
-                        ft.Text("Start analyzing to build your history", size=14, color=TEXT_SECONDARY)
-                    ], horizontal_alignment="center"),
-                    padding=40
-                )
-            ]
+        update_history_widgets()
         
         history_view.content = ft.Column([
-            ft.Container(height=60),
-            
             ft.Container(
-                padding=28,
+                padding=_HEADER_PADDING,
                 content=ft.Row([
                     ft.Column([
                         ft.Text("📊 History", size=36, weight="bold", color=TEXT_PRIMARY),
-                        ft.Container(height=8),
-                        ft.Text(f"{len(scan_history)} total scans", size=15, color=TEXT_SECONDARY)
-                    ], expand=True),
+                        history_count_text
+                    ], spacing=28, expand=True),
                     ft.Container(
                         content=ft.Icon("filter_list", color=NEON_CYAN, size=24),
                         bgcolor="#00FFD115",
-                        border=ft.border.all(1, "#00FFD130"),
+                        border=CYAN_BORDER,
                         padding=14,
                         border_radius=16
                     )
                 ], alignment="spaceBetween")
             ),
             
-            ft.Container(height=8),
-            
             ft.Container(
-                content=ft.Column(history_items),
+                content=history_column,
                 padding=24
             )
-        ], scroll="auto", expand=True)
+        ], scroll="auto", expand=True, spacing=28, on_scroll=on_history_scroll)
+
+    # Account stats card: built once, its numbers are updated in place by
+    # update_stats_widgets, so rebuilding the Account view reuses it
+    account_stats_card = ft.Container(
+        content=_premium_card(
+            ft.Row([
+                ft.Column([
+                    ft.Icon("insights", color=ELECTRIC_BLUE, size=32),
+                    account_scans_text,
+                    ft.Text("Scans", size=12, color=TEXT_SECONDARY)
+                ], horizontal_alignment="center", spacing=6),
+                ft.Container(width=2, height=70, bgcolor=BORDER_COLOR),
+                ft.Column([
+                    ft.Icon("verified", color=LIME_GREEN, size=32),
+                    account_conf_text,
+                    ft.Text("Accuracy", size=12, color=TEXT_SECONDARY)
+                ], horizontal_alignment="center", spacing=6),
+                ft.Container(width=2, height=70, bgcolor=BORDER_COLOR),
+                ft.Column([
+                    ft.Icon("trending_up", color=VIVID_PURPLE, size=32),
+                    account_week_text,
+                    ft.Text("This Week", size=12, color=TEXT_SECONDARY)
+                ], horizontal_alignment="center", spacing=6),
+            ], alignment="spaceAround"),
+            has_glow=True,
+            padding=24
+        ),
+        margin=_MARGIN_STATS
+    )
 
     # Build Authentication View
     def build_auth():
         if current_user["logged_in"]:
+            update_stats_widgets()
             auth_view.content = ft.Column([
                 ft.Container(
                     content=ft.Column([
-                        ft.Container(height=60),
                         ft.Container(
                             content=ft.Icon("person", size=56, color=WHITE),
                             gradient=PURPLE_GLOW,
                             border=ft.border.all(4, "#FFFFFF20"),
                             padding=32,
                             border_radius=100,
-                            shadow=GLOW_EFFECT
+                            shadow=GLOW_EFFECT,
+                            margin=ft.margin.only(bottom=30)
                         ),
-                        ft.Container(height=20),
                         ft.Text(current_user["data"]["username"], color=TEXT_PRIMARY, weight="bold", size=28),
                         ft.Text(current_user["data"]["email"], color=TEXT_SECONDARY, size=14)
                     ], horizontal_alignment="center"),
                     gradient=MESH_GRADIENT,
-                    padding=40,
+                    padding=ft.padding.only(left=40, top=110, right=40, bottom=40),
                     height=320
                 ),
                 
-                ft.Container(
-                    content=_premium_card(
-                        ft.Row([
-                            ft.Column([
-                                ft.Icon("insights", color=ELECTRIC_BLUE, size=32),
-                                ft.Text(str(user_stats["total_scans"]), weight="bold", size=24, color=TEXT_PRIMARY),
-                                ft.Text("Scans", size=12, color=TEXT_SECONDARY)
-                            ], horizontal_alignment="center", spacing=6),
-                            ft.Container(width=2, height=70, bgcolor=BORDER_COLOR),
-                            ft.Column([
-                                ft.Icon("verified", color=LIME_GREEN, size=32),
-                                ft.Text(f"{user_stats['avg_confidence']}%", weight="bold", size=24, color=TEXT_PRIMARY),
-                                ft.Text("Accuracy", size=12, color=TEXT_SECONDARY)
-                            ], horizontal_alignment="center", spacing=6),
-                            ft.Container(width=2, height=70, bgcolor=BORDER_COLOR),
-                            ft.Column([
-                                ft.Icon("trending_up", color=VIVID_PURPLE, size=32),
-                                ft.Text(str(user_stats["week_scans"]), weight="bold", size=24, color=TEXT_PRIMARY),
-                                ft.Text("This Week", size=12, color=TEXT_SECONDARY)
-                            ], horizontal_alignment="center", spacing=6),
-                        ], alignment="spaceAround"),
-                        has_glow=True,
-                        padding=24
-                    ),
-                    margin=ft.margin.only(top=-60, left=24, right=24)
-                ),
-                
-                ft.Container(height=24),
+                account_stats_card,
                 
                 ft.Container(
                     content=ft.Column([
-                        _feature_card("settings", "Settings", "App preferences"),
-                        _feature_card("notifications", "Notifications", "Manage alerts"),
-                        _feature_card("help_outline", "Help & Support", "Get assistance"),
+                        _static_feature_card("settings", "Settings", "App preferences"),
+                        _static_feature_card("notifications", "Notifications", "Manage alerts"),
+                        _static_feature_card("help_outline", "Help & Support", "Get assistance"),
                         ft.Container(
                             content=ft.Row([
                                 ft.Container(
                                     content=ft.Icon("logout", size=26, color="#EF4444"),
                                     bgcolor="#EF444415",
-                                    border=ft.border.all(1, "#EF444430"),
+                                    border=_BORDER_ERR,
                                     padding=16,
-                                    border_radius=18
+                                    border_radius=18,
+                                    margin=_MARGIN_ICON
                                 ),
-                                ft.Container(width=16),
                                 ft.Column([
                                     ft.Text("Log Out", weight="w600", size=16, color="#EF4444"),
                                     ft.Text("Sign out of account", size=13, color=TEXT_SECONDARY)
@@ -814,13 +1029,13 @@ def main(page: ft.Page):
                                 ft.Icon("chevron_right", size=22, color=TEXT_MUTED)
                             ], alignment="center"),
                             bgcolor=SURFACE,
-                            border=ft.border.all(1, BORDER_COLOR),
+                            border=_BORDER_1,
                             border_radius=20,
                             padding=20,
                             on_click=lambda e: handle_logout()
                         ),
                     ]),
-                    padding=24
+                    padding=_SECTION_PADDING
                 )
             ], scroll="auto", expand=True)
             return
@@ -831,8 +1046,7 @@ def main(page: ft.Page):
             hint_text="Enter your username",
             border_color=BORDER_COLOR,
             focused_border_color=NEON_CYAN,
-            text_size=15,
-            visible=not is_login_mode[0]
+            text_size=15
         )
         
         email_field = ft.TextField(
@@ -856,24 +1070,59 @@ def main(page: ft.Page):
         
         error_text = ft.Text("", color="#EF4444", size=13, visible=False)
         
-        def handle_auth(e):
+        # Leaf controls that differ between Sign In and Sign Up; toggle_mode
+        # rewrites these instead of rebuilding the form
+        auth_icon = ft.Icon(size=64, color=NEON_CYAN)
+        auth_title = ft.Text(size=32, weight="bold", color=TEXT_PRIMARY)
+        auth_subtitle = ft.Text(size=15, color=TEXT_SECONDARY)
+        auth_prompt = ft.Text(size=13, color=TEXT_SECONDARY)
+        auth_switch = ft.TextButton(style=ft.ButtonStyle(color=NEON_CYAN, padding=0))
+        auth_button_label = ft.Text(weight="bold", color=WHITE, size=17)
+        auth_button_ring = ft.ProgressRing(width=20, height=20, color=WHITE, stroke_width=2)
+        
+        def set_auth_busy(busy):
+            """Swap the submit button to a spinner while the hash runs"""
+            auth_button.content = auth_button_ring if busy else auth_button_label
+            auth_button.on_click = None if busy else handle_auth
+            # Leaving the busy state is flushed by handle_auth's final update
+            if busy:
+                page.update()
+        
+        def show_validation_error(message):
+            """Show a form error, skipping the update if it is already shown"""
+            if error_text.visible and error_text.value == message:
+                return
+            error_text.value = message
+            error_text.visible = True
+            page.update()
+        
+        async def handle_auth(e):
+            # The button is detached while busy, but Enter in the password
+            # field can still fire; only one submission runs at a time
+            if _auth_inflight[0]:
+                return
+            _auth_inflight[0] = True
+            try:
+                await submit_auth()
+            finally:
+                _auth_inflight[0] = False
+        
+        async def submit_auth():
             if not is_login_mode[0]:
                 # Sign Up
                 if not username_field.value or not email_field.value or not password_field.value:
-                    error_text.value = "All fields are required"
-                    error_text.visible = True
-                    page.update()
+                    show_validation_error("All fields are required")
                     return
                 
-                success, message = create_user(username_field.value, email_field.value, password_field.value)
+                # Key derivation is CPU-bound; keep it off the UI event loop
+                set_auth_busy(True)
+                success, message = await asyncio.to_thread(
+                    create_user, username_field.value, email_field.value, password_field.value
+                )
+                set_auth_busy(False)
                 
                 if success:
-                    error_text.visible = False
-                    page.open(ft.SnackBar(
-                        ft.Text("✓ Account created! Please sign in.", color=WHITE, weight="bold"),
-                        bgcolor="#10B981",
-                        behavior=ft.SnackBarBehavior.FLOATING
-                    ))
+                    arm_snack("✓ Account created! Please sign in.", "#10B981")
                     toggle_mode(None)
                 else:
                     error_text.value = message
@@ -881,12 +1130,14 @@ def main(page: ft.Page):
             else:
                 # Sign In
                 if not email_field.value or not password_field.value:
-                    error_text.value = "Email and password are required"
-                    error_text.visible = True
-                    page.update()
+                    show_validation_error("Email and password are required")
                     return
                 
-                success, user_data = verify_user(email_field.value, password_field.value)
+                set_auth_busy(True)
+                success, user_data = await asyncio.to_thread(
+                    verify_user, email_field.value, password_field.value
+                )
+                set_auth_busy(False)
                 
                 if success:
                     current_user["logged_in"] = True
@@ -894,59 +1145,75 @@ def main(page: ft.Page):
                     error_text.visible = False
                     
                     # Load user stats
-                    refresh_user_data()
+                    refresh_user_data(update=False)
                     
-                    # Rebuild all views with new auth state
-                    build_home()
-                    build_analyze()
-                    build_auth()
+                    # Views pick up the new auth state on their next visit
+                    _dirty.update(home=True, analyze=True, history=True, auth=True)
                     
-                    # Switch to home and show success message
-                    switch_tab(0)
-                    
-                    page.open(ft.SnackBar(
-                        ft.Text(f"✓ Welcome back, {user_data['username']}!", color=WHITE, weight="bold"),
-                        bgcolor="#10B981",
-                        behavior=ft.SnackBarBehavior.FLOATING
-                    ))
-                    page.update()
+                    # Switch to home and show success message; both go out
+                    # with the single update below
+                    switch_tab(0, update=False)
+                    arm_snack(f"✓ Welcome back, {user_data['username']}!", "#10B981")
                 else:
                     error_text.value = "Invalid email or password"
                     error_text.visible = True
             
             page.update()
         
+        auth_button = ft.Container(
+            content=auth_button_label,
+            gradient=CYAN_GLOW,
+            padding=22,
+            border_radius=18,
+            shadow=BUTTON_SHADOW,
+            alignment=ft.alignment.center,
+            on_click=handle_auth
+        )
+        
+        def apply_auth_mode():
+            login = is_login_mode[0]
+            auth_icon.name = "lock_person" if login else "person_add"
+            auth_title.value = "Welcome Back!" if login else "Create Account"
+            auth_subtitle.value = "Sign in to continue" if login else "Sign up to get started"
+            auth_button_label.value = "Sign In" if login else "Sign Up"
+            auth_prompt.value = "Don't have an account?" if login else "Already have an account?"
+            auth_switch.text = "Sign Up" if login else "Sign In"
+            username_field.visible = not login
+        
         def toggle_mode(e):
             is_login_mode[0] = not is_login_mode[0]
-            username_field.visible = not is_login_mode[0]
+            apply_auth_mode()
             error_text.visible = False
-            build_auth()
             page.update()
         
+        auth_switch.on_click = toggle_mode
+        # Enter moves Username -> Email -> Password, then submits
+        username_field.on_submit = lambda e: email_field.focus()
+        email_field.on_submit = lambda e: password_field.focus()
+        password_field.on_submit = handle_auth
+        apply_auth_mode()
+        
         auth_view.content = ft.Column([
-            ft.Container(height=60),
-            
             ft.Container(
                 content=ft.Column([
                     ft.Container(
-                        content=ft.Icon("lock_person" if is_login_mode[0] else "person_add", size=64, color=NEON_CYAN),
+                        content=auth_icon,
                         gradient=CYAN_GLOW,
                         padding=24,
                         border_radius=100,
-                        shadow=GLOW_EFFECT
+                        shadow=GLOW_EFFECT,
+                        margin=ft.margin.only(bottom=16)
                     ),
-                    ft.Container(height=24),
-                    ft.Text("Welcome Back!" if is_login_mode[0] else "Create Account", size=32, weight="bold", color=TEXT_PRIMARY),
-                    ft.Container(height=8),
-                    ft.Text("Sign in to continue" if is_login_mode[0] else "Sign up to get started", size=15, color=TEXT_SECONDARY)
-                ], horizontal_alignment="center"),
-                padding=28
+                    auth_title,
+                    auth_subtitle
+                ], horizontal_alignment="center", spacing=28),
+                padding=_HEADER_PADDING
             ),
             
-            ft.Container(height=16),
-            
             ft.Container(
                 content=_premium_card(
+                    # Fixed spacers: the error line toggles visibility and
+                    # its gaps must not collapse with it
                     ft.Column([
                         username_field,
                         ft.Container(height=16),
@@ -956,55 +1223,44 @@ def main(page: ft.Page):
                         ft.Container(height=8),
                         error_text,
                         ft.Container(height=24),
-                        ft.Container(
-                            content=ft.Text("Sign In" if is_login_mode[0] else "Sign Up", weight="bold", color=WHITE, size=17),
-                            gradient=CYAN_GLOW,
-                            padding=22,
-                            border_radius=18,
-                            shadow=BUTTON_SHADOW,
-                            alignment=ft.alignment.center,
-                            on_click=handle_auth
-                        ),
+                        auth_button,
                         ft.Container(height=16),
-                        ft.Row([
-                            ft.Text("Don't have an account?" if is_login_mode[0] else "Already have an account?", size=13, color=TEXT_SECONDARY),
-                            ft.TextButton(
-                                "Sign Up" if is_login_mode[0] else "Sign In",
-                                style=ft.ButtonStyle(color=NEON_CYAN, padding=0),
-                                on_click=toggle_mode
-                            )
-                        ], alignment="center")
+                        ft.Row([auth_prompt, auth_switch], alignment="center")
                     ], spacing=0)
                 ),
                 padding=24
             )
-        ], scroll="auto", expand=True, horizontal_alignment="center")
-
-    # --- 7. NAVIGATION SYSTEM ---
-    main_stack = ft.Stack([
-        home_view,
-        analyze_view,
-        history_view,
-        auth_view
-    ], expand=True)
-
-    def switch_tab(index):
-        home_view.visible = False
-        analyze_view.visible = False
-        history_view.visible = False
-        auth_view.visible = False
+        ], scroll="auto", expand=True, horizontal_alignment="center", spacing=36)
+
+    # --- 6. NAVIGATION SYSTEM ---
+    # Only the active view is mounted; the others stay built but off-page
+    main_container = ft.Container(expand=True)
+
+    _TAB_BUILDERS = (
+        ("home", build_home),
+        ("analyze", build_analyze),
+        ("history", build_history),
+        ("auth", build_auth),
+    )
+
+    views = (home_view, analyze_view, history_view, auth_view)
+    _current_tab = [None]
+
+    def switch_tab(index, update=True):
+        name, build = _TAB_BUILDERS[index]
+        # Re-selecting the visible tab is a no-op unless it needs a rebuild
+        if index == _current_tab[0] and not _dirty[name]:
+            return
+        _current_tab[0] = index
         
-        if index == 0:
-            home_view.visible = True
-        elif index == 1:
-            analyze_view.visible = True
-        elif index == 2:
-            history_view.visible = True
-        elif index == 3:
-            auth_view.visible = True
+        if _dirty[name]:
+            build()
+            _dirty[name] = False
         
+        main_container.content = views[index]
         page.navigation_bar.selected_index = index
-        page.update()
+        if update:
+            page.update()
 
     # Premium Navigation Bar
     page.navigation_bar = ft.NavigationBar(
@@ -1012,26 +1268,20 @@ def main(page: ft.Page):
         indicator_color="#00FFD120",
         surface_tint_color=NEON_CYAN,
         elevation=0,
-        border=ft.border.only(top=ft.BorderSide(1, BORDER_COLOR)),
+        border=_NAV_TOP_BORDER,
         height=75,
         selected_index=0,
         label_behavior=ft.NavigationBarLabelBehavior.ONLY_SHOW_SELECTED,
         on_change=lambda e: switch_tab(e.control.selected_index),
         destinations=[
-            ft.NavigationBarDestination(icon="home_outlined", selected_icon="home", label="Home"),
-            ft.NavigationBarDestination(icon="camera_alt_outlined", selected_icon="camera_alt", label="Analyze"),
-            ft.NavigationBarDestination(icon="history", label="History"),
-            ft.NavigationBarDestination(icon="person_outline", selected_icon="person", label="Account"),
+            ft.NavigationBarDestination(icon=icon, selected_icon=selected_icon, label=label)
+            for icon, selected_icon, label in _NAV_DESTINATIONS
         ]
     )
 
-    # Initialize all views
-    build_home()
-    build_analyze()
-    build_history()
-    build_auth()
-
+    # Views are built on first visit
+    page.add(main_container)
     switch_tab(0)
-    page.add(main_stack)
 
-ft.app(target=main)
\ No newline at end of file
+if __name__ == "__main__":
+    ft.app(target=main)
\ No newline at end of file
@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+torch = pytest.importorskip("torch")
+models = pytest.importorskip("torchvision.models")
+pytest.importorskip("fastapi")
+
+import backend
+
+
+def random_resnet18():
+    torch.manual_seed(0)
+    m = models.resnet18(weights=None)
+    # Non-trivial BN statistics, so the comparison isn't against a near-identity net
+    for module in m.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+    return m.eval()
+
+
+def normalize(x):
+    mean = torch.tensor(backend.IMAGENET_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(backend.IMAGENET_STD).view(1, 3, 1, 1)
+    return (x - mean) / std
+
+
+@pytest.mark.parametrize("fuse", [False, True])
+def test_folded_normalization_matches_unfolded(fuse):
+    reference = random_resnet18()
+    folded = backend.fold_input_normalization(copy.deepcopy(reference))
+    if fuse:
+        backend.fuse_conv_bn(folded)
+
+    x = torch.rand(2, 3, *backend.IMAGE_SIZE)
+    with torch.no_grad():
+        expected = reference(normalize(x))
+        actual = folded(backend.pad_input(x))
+
+    assert backend.pad_input(x).shape[1:] == backend.INPUT_SHAPE[1:]
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-4)
@@ -0,0 +1,113 @@
+import hashlib
+import sqlite3
+
+import pytest
+
+pytest.importorskip("flet")
+
+import main
+
+# scan_history as created before ON DELETE CASCADE was declared
+OLD_SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE scan_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        weight_kg REAL NOT NULL,
+        confidence REAL NOT NULL,
+        status TEXT NOT NULL,
+        image_name TEXT,
+        scan_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+'''
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "sheep_app.db")
+    monkeypatch.setattr(main, "DB_PATH", path)
+    monkeypatch.setattr(main, "_CONN", None)
+    main._verified_users.clear()
+    main._query_user_scans.cache_clear()
+    main._query_user_stats.cache_clear()
+    yield path
+    if main._CONN is not None:
+        main._CONN.close()
+
+
+def legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.execute(
+        "INSERT INTO users (id, username, email, password_hash) VALUES (1, 'bob', 'bob@x', ?)",
+        (hashlib.sha256(b"pw").hexdigest(),)
+    )
+    conn.executemany(
+        "INSERT INTO scan_history (user_id, weight_kg, confidence, status, image_name, scan_date) "
+        "VALUES (?, 50.0, 90.0, 'Healthy', 'a.jpg', ?)",
+        [(1, "2025-03-07 10:00:00"), (1, "2024-12-31 23:59:59"), (99, "2025-01-01 00:00:00")]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_migration_drops_orphans_and_cascades(db_path):
+    legacy_db(db_path)
+    main.init_database()
+
+    with main.db_cursor() as cursor:
+        cursor.execute("SELECT user_id FROM scan_history ORDER BY id")
+        assert cursor.fetchall() == [(1,), (1,)]
+        cursor.execute("PRAGMA foreign_key_list(scan_history)")
+        assert [fk[6] for fk in cursor.fetchall()] == ["CASCADE"]
+
+        cursor.execute("DELETE FROM users WHERE id = 1")
+        cursor.execute("SELECT COUNT(*) FROM scan_history")
+        assert cursor.fetchone() == (0,)
+
+
+def test_migration_runs_once(db_path):
+    legacy_db(db_path)
+    main.init_database()
+    conn = main.get_connection()
+    schema = conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+    changes = conn.total_changes
+
+    main.init_database()
+
+    assert conn.total_changes == changes
+    assert conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+
+def test_scan_dates_render_as_month_day_year(db_path):
+    legacy_db(db_path)
+    main.init_database()
+
+    assert [scan[5] for scan in main.get_user_scans(1)] == ["Dec 31, 2024", "Mar 07, 2025"]
+
+
+def test_legacy_hash_is_upgraded_to_scrypt(db_path):
+    legacy_db(db_path)
+    main.init_database()
+
+    assert main.verify_user("bob@x", "wrong") == (False, None)
+    ok, user = main.verify_user("bob@x", "pw")
+    assert ok and user["id"] == 1
+
+    with main.db_cursor() as cursor:
+        cursor.execute("SELECT password_hash, salt FROM users WHERE id = 1")
+        password_hash, salt = cursor.fetchone()
+    assert salt is not None
+    assert password_hash == main.hash_password("pw", salt)
+
+    # Sign in again from the upgraded row, not from the login cache
+    main._verified_users.clear()
+    assert main.verify_user("bob@x", "pw")[0]
+    assert main.verify_user("bob@x", "wrong") == (False, None)